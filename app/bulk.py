@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.db import get_database
+from app.deadline import DeadlineExceeded, mongo_deadline, remaining
+from app.models import BulkStatusChange
+from app.rabbitmq_event import send_message_to_rabbitmq
+
+logger = logging.getLogger(__name__)
+
+# Cantidad de documentos por update_many y por evento publicado
+BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", "1000"))
+
+# Tiempo del deadline que se reserva para responder con el progreso parcial
+# antes de que el middleware corte el request con un 503
+BULK_RESPONSE_RESERVE_MS = int(os.environ.get("BULK_RESPONSE_RESERVE_MS", "1000"))
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def build_query(change: BulkStatusChange, allowed_filters: set[str]) -> dict:
+    if bool(change.ids) == bool(change.filter):
+        raise ValueError("Provide either a non-empty list of ids or a filter.")
+
+    # Solo se tocan los documentos que realmente cambian de estado
+    query = {"status": {"$ne": change.status}}
+    if change.ids:
+        try:
+            query["_id"] = {"$in": [ObjectId(id) for id in change.ids]}
+        except InvalidId as e:
+            raise ValueError(str(e))
+    else:
+        invalid = set(change.filter) - allowed_filters
+        if invalid:
+            raise ValueError(f"Unsupported filter fields: {', '.join(sorted(invalid))}.")
+        query.update(change.filter)
+    return query
+
+
+def bulk_change_status(collection_name: str, entity: str, change: BulkStatusChange, allowed_filters: set[str]) -> dict:
+    """
+    Cambia el estado de todos los documentos que coinciden con los ids o el
+    filtro de `change`, en bloques de BULK_CHUNK_SIZE.
+
+    Por cada bloque se ejecuta un único update_many y se publica un único
+    evento `<entity>.<acción>` con la lista de ids afectados, en vez de un
+    evento (y una conexión a RabbitMQ) por documento.
+
+    Si publicar el evento de un bloque falla, el resto continúa y sus ids se
+    informan en `unpublished_ids`. Si se agota el deadline, se retorna el
+    progreso parcial con `completed` en false; los documentos no procesados
+    siguen coincidiendo con el filtro y se pueden reintentar. Los ids del
+    bloque interrumpido también van en `unpublished_ids`, ya que pudo
+    aplicarse en parte y no se publicó su evento.
+
+    Con `dry_run` solo se cuenta cuántos documentos serían afectados.
+    """
+    collection = get_database()[collection_name]
+    query = build_query(change, allowed_filters)
+
+    if change.dry_run:
+        with mongo_deadline():
+            matched_count = collection.count_documents(query)
+        return {"dry_run": True, "matched_count": matched_count}
+
+    with mongo_deadline():
+        ids = [document["_id"] for document in collection.find(query, {"_id": 1})]
+
+    action = "deleted" if change.status == "inactive" else "updated"
+    reserve = BULK_RESPONSE_RESERVE_MS / 1000
+    modified_count = 0
+    events_published = 0
+    unpublished_ids = []
+    processed_count = 0
+    for chunk in _chunks(ids, BULK_CHUNK_SIZE):
+        # Sin tiempo restante se devuelve lo hecho hasta ahora en vez de un 503,
+        # para no perder la lista de ids cuyo evento no se publicó
+        left = remaining()
+        if left is not None and left <= reserve:
+            break
+        try:
+            with mongo_deadline(reserve=reserve):
+                result = collection.update_many(
+                    {"_id": {"$in": chunk}, "status": {"$ne": change.status}},
+                    {"$set": {"status": change.status}},
+                )
+        except DeadlineExceeded:
+            logger.warning(f"Deadline agotado actualizando {len(chunk)} documentos de {collection_name}")
+            unpublished_ids += [str(id) for id in chunk]
+            break
+        modified_count += result.modified_count
+        processed_count += len(chunk)
+
+        # Los documentos del bloque ya cambiaron de estado y un reintento no
+        # los volvería a encontrar, así que un fallo al publicar se informa
+        # con sus ids en vez de abortar
+        message = json.dumps({"ids": [str(id) for id in chunk], "status": change.status})
+        try:
+            send_message_to_rabbitmq(f"{entity}.{action}", message)
+            events_published += 1
+        except Exception as e:
+            logger.error(f"No se pudo publicar el evento de {len(chunk)} documentos de {collection_name}: {e}")
+            unpublished_ids += [str(id) for id in chunk]
+
+    return {
+        "dry_run": False,
+        "completed": processed_count == len(ids),
+        "matched_count": len(ids),
+        "processed_count": processed_count,
+        "modified_count": modified_count,
+        "events_published": events_published,
+        "unpublished_ids": unpublished_ids,
+    }
@@ -0,0 +1,42 @@
+import os
+import threading
+
+from pymongo import MongoClient
+
+MONGODB_HOST = os.environ.get("MONGODB_HOST", "user_service_mongodb")
+MONGODB_PORT = int(os.environ.get("MONGODB_PORT", "27017"))
+MONGODB_MAX_POOL_SIZE = int(os.environ.get("MONGODB_MAX_POOL_SIZE", "100"))
+
+_client_lock = threading.Lock()
+_client = None
+_client_pid = None
+
+
+def get_client() -> MongoClient:
+    """
+    Retorna el cliente de MongoDB del proceso actual, creándolo en el primer uso.
+
+    MongoClient no es seguro tras un fork, por lo que cada worker crea el suyo
+    en vez de heredar el del proceso maestro.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = MongoClient(MONGODB_HOST, MONGODB_PORT, maxPoolSize=MONGODB_MAX_POOL_SIZE)
+                _client_pid = pid
+    return _client
+
+
+def get_database():
+    return get_client().user_service
+
+
+def close_client():
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
@@ -0,0 +1,171 @@
+import asyncio
+import contextvars
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import pymongo
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pymongo.errors import PyMongoError
+from starlette.middleware.base import BaseHTTPMiddleware
+
+# Presupuesto por defecto de cada request, en milisegundos (0 lo desactiva)
+DEFAULT_BUDGET_MS = int(os.environ.get("REQUEST_DEADLINE_MS", "5000"))
+
+# Presupuesto de las operaciones masivas, que recorren muchos documentos
+BULK_DEADLINE_MS = int(os.environ.get("BULK_DEADLINE_MS", "30000"))
+
+# Presupuestos por prefijo de ruta; gana el prefijo más largo que coincida
+ROUTE_BUDGETS_MS = {
+    "/api/v1/auth": int(os.environ.get("AUTH_DEADLINE_MS", "3000")),
+    "/health": int(os.environ.get("HEALTH_DEADLINE_MS", "1000")),
+    "/api/v1/students/bulk": BULK_DEADLINE_MS,
+    "/api/v1/professors/bulk": BULK_DEADLINE_MS,
+    "/api/v1/admins/bulk": BULK_DEADLINE_MS,
+}
+
+# Margen que el middleware concede para que MongoDB o RabbitMQ reporten su
+# propio timeout antes de cortar el request desde afuera. pymongo puede tardar
+# unos cientos de ms en reportarlo; si el corte llega antes, la expiración se
+# registra en la etapa "request" y no en la que realmente se quedó sin tiempo.
+HARD_TIMEOUT_GRACE_MS = int(os.environ.get("DEADLINE_GRACE_MS", "500"))
+
+# Límites superiores (ms) de los buckets del histograma de expiraciones
+HISTOGRAM_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+# Los ObjectId de la ruta se agrupan para no crear una serie por documento
+OBJECT_ID_SEGMENT = re.compile(r"/[0-9a-fA-F]{24}(?=/|$)")
+
+
+@dataclass
+class Deadline:
+    route: str
+    start: float
+    expires_at: float
+    # Cada request expirado se cuenta una sola vez en el histograma, aunque el
+    # middleware y el hilo del endpoint lo detecten por separado
+    recorded: bool = False
+
+
+_current_deadline = contextvars.ContextVar("current_deadline", default=None)
+
+_histogram_lock = threading.Lock()
+_expirations = {}
+
+
+class DeadlineExceeded(HTTPException):
+    def __init__(self, stage: str):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Deadline exceeded during {stage}",
+        )
+        self.stage = stage
+
+
+def budget_for(path: str) -> int:
+    matches = [prefix for prefix in ROUTE_BUDGETS_MS if path.startswith(prefix)]
+    if not matches:
+        return DEFAULT_BUDGET_MS
+    return ROUTE_BUDGETS_MS[max(matches, key=len)]
+
+
+def remaining() -> float | None:
+    """
+    Segundos que le quedan al request actual, o None si no hay deadline
+    (por ejemplo, en los hilos de los consumidores).
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline.expires_at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def record_expiry(stage: str):
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return
+    elapsed_ms = (time.monotonic() - deadline.start) * 1000
+    bucket = next(i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if elapsed_ms <= bound)
+    with _histogram_lock:
+        if deadline.recorded:
+            return
+        deadline.recorded = True
+        counts = _expirations.setdefault(
+            (deadline.route, stage), [0] * len(HISTOGRAM_BUCKETS_MS)
+        )
+        counts[bucket] += 1
+
+
+def check(stage: str):
+    if expired():
+        record_expiry(stage)
+        raise DeadlineExceeded(stage)
+
+
+@contextmanager
+def mongo_deadline(reserve: float = 0):
+    """
+    Aplica el tiempo restante del request, menos `reserve` segundos, a las
+    operaciones de MongoDB del bloque. pymongo lo envía al servidor como
+    maxTimeMS y lo usa como timeoutMS del lado del cliente.
+    """
+    # Se lee el reloj una sola vez: pymongo.timeout rechaza valores negativos
+    left = remaining()
+    if left is not None:
+        left -= reserve
+        if left <= 0:
+            record_expiry("mongo")
+            raise DeadlineExceeded("mongo")
+    try:
+        with pymongo.timeout(left):
+            yield
+    except PyMongoError as e:
+        if e.timeout:
+            record_expiry("mongo")
+            raise DeadlineExceeded("mongo") from e
+        raise
+
+
+def expiry_histogram() -> dict:
+    with _histogram_lock:
+        series = [
+            {"route": route, "stage": stage, "counts": list(counts), "total": sum(counts)}
+            for (route, stage), counts in sorted(_expirations.items())
+        ]
+    return {
+        "buckets_ms": [bound if bound != float("inf") else "+Inf" for bound in HISTOGRAM_BUCKETS_MS],
+        "series": series,
+    }
+
+
+class DeadlineMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        path = request.url.path
+        budget = budget_for(path) / 1000
+        if budget <= 0:
+            return await call_next(request)
+
+        start = time.monotonic()
+        route = OBJECT_ID_SEGMENT.sub("/{id}", path)
+        token = _current_deadline.set(Deadline(route=route, start=start, expires_at=start + budget))
+        try:
+            return await asyncio.wait_for(
+                call_next(request), timeout=budget + HARD_TIMEOUT_GRACE_MS / 1000
+            )
+        except asyncio.TimeoutError:
+            record_expiry("request")
+            return JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"detail": "Deadline exceeded during request"},
+            )
+        finally:
+            _current_deadline.reset(token)
@@ -0,0 +1,113 @@
+import logging
+import re
+
+from bson import ObjectId
+
+from app.db import get_database
+from app.models import Admin, Professor, Student
+
+logger = logging.getLogger(__name__)
+
+# Colección y modelo de cada rol. El orden define la precedencia cuando un
+# mismo email aparece en más de una colección (el mismo que usaba auth).
+ROLE_COLLECTIONS = {
+    "student": ("students", Student),
+    "administrator": ("admins", Admin),
+    "professor": ("professors", Professor),
+}
+
+def ensure_indexes():
+    """
+    Crea los índices que usa el directorio: email para las búsquedas y
+    (status, _id) para el listado paginado. Se ejecuta al iniciar cada
+    worker, fuera de los requests y sin deadline; create_index no hace nada
+    si el índice ya existe.
+    """
+    try:
+        db = get_database()
+        for collection_name, _ in ROLE_COLLECTIONS.values():
+            db[collection_name].create_index("email")
+            db[collection_name].create_index([("status", 1), ("_id", 1)])
+    except Exception as e:
+        # Sin índices las consultas siguen funcionando, aunque más lentas
+        logger.warning(f"No se pudieron crear los índices del directorio: {e}")
+
+
+def to_model(user: dict):
+    return ROLE_COLLECTIONS[user["role"]][1](**user)
+
+
+def _union(roles: list[str], branch, tail: list[dict]) -> list[dict]:
+    """
+    Ejecuta `branch(role)` sobre la colección de cada rol y une los resultados
+    con $unionWith en una sola consulta, aplicando `tail` al resultado combinado.
+    """
+    first, *others = roles
+    pipeline = list(branch(first))
+    for role in others:
+        pipeline.append({"$unionWith": {"coll": ROLE_COLLECTIONS[role][0], "pipeline": branch(role)}})
+    pipeline += tail
+    return list(get_database()[ROLE_COLLECTIONS[first][0]].aggregate(pipeline))
+
+
+def list_users(
+    roles: list[str] | None = None,
+    status: str | None = "active",
+    name_prefix: str | None = None,
+    after: str | None = None,
+    limit: int = 50,
+) -> tuple[list[dict], str | None]:
+    """
+    Lista usuarios de todos los roles ordenados por _id, con paginación por keyset.
+
+    Cada colección aporta como máximo `limit + 1` documentos usando su índice
+    (status, _id), así que el costo no depende de la página pedida.
+
+    Retorna la página y el cursor para pedir la siguiente (None si no hay más).
+    """
+    roles = [role for role in ROLE_COLLECTIONS if roles is None or role in roles]
+
+    match = {}
+    if status is not None:
+        match["status"] = status
+    if name_prefix:
+        match["name"] = {"$regex": f"^{re.escape(name_prefix)}"}
+    if after is not None:
+        match["_id"] = {"$gt": ObjectId(after)}
+
+    def branch(role):
+        return [
+            {"$match": match},
+            {"$sort": {"_id": 1}},
+            {"$limit": limit + 1},
+            {"$project": {"password": 0}},
+            {"$addFields": {"role": role}},
+        ]
+
+    users = _union(roles, branch, [{"$sort": {"_id": 1}}, {"$limit": limit + 1}])
+    if len(users) > limit:
+        users = users[:limit]
+        return users, str(users[-1]["_id"])
+    return users, None
+
+
+def find_user_by_email(email: str, include_password: bool = False) -> dict | None:
+    """
+    Busca un usuario por email en las tres colecciones con una sola consulta.
+    Si el email existe en más de una colección, gana la de mayor precedencia.
+    """
+    projection = {"_rank": 0} if include_password else {"_rank": 0, "password": 0}
+
+    def branch(role):
+        return [
+            {"$match": {"email": email}},
+            {"$limit": 1},
+            {"$addFields": {"role": role, "_rank": list(ROLE_COLLECTIONS).index(role)}},
+        ]
+
+    users = _union(list(ROLE_COLLECTIONS), branch, [{"$sort": {"_rank": 1}}, {"$limit": 1}, {"$project": projection}])
+    return users[0] if users else None
+
+
+def collection_for(user: dict):
+    return get_database()[ROLE_COLLECTIONS[user["role"]][0]]
@@ -0,0 +1,359 @@
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+import pika # type: ignore
+
+from app.deadline import DeadlineExceeded, check, expired, record_expiry, remaining
+
+logger = logging.getLogger(__name__)
+
+# "amqp" usa RabbitMQ; "memory" usa un bus en proceso, sin broker externo
+EVENT_TRANSPORT = os.environ.get("EVENT_TRANSPORT", "amqp")
+
+RABBITMQ_HOST = os.environ.get("RABBITMQ_HOST", "user_service_rabbitmq")
+RABBITMQ_PORT = int(os.environ.get("RABBITMQ_PORT", "5672"))
+RABBITMQ_USER = os.environ.get("RABBITMQ_USER", "user")
+RABBITMQ_PASSWORD = os.environ.get("RABBITMQ_PASSWORD", "password")
+
+# Mensajes que el bus en proceso guarda por cola antes de bloquear a quien publica
+EVENT_BUS_MAX_BUFFER = int(os.environ.get("EVENT_BUS_MAX_BUFFER", "10000"))
+
+# Cantidad máxima de colas que el bus en proceso mantiene a la vez
+EVENT_BUS_MAX_QUEUES = int(os.environ.get("EVENT_BUS_MAX_QUEUES", "1000"))
+
+# Espera antes de reintentar un lote cuyo procesamiento falló
+CONSUMER_RETRY_DELAY_MS = int(os.environ.get("CONSUMER_RETRY_DELAY_MS", "1000"))
+
+# Intentos de procesar un lote antes de moverlo a la cola '<cola>.dead'
+CONSUMER_MAX_ATTEMPTS = int(os.environ.get("CONSUMER_MAX_ATTEMPTS", "5"))
+
+
+@dataclass(frozen=True)
+class Event:
+    id: str
+    routing_key: str
+    body: bytes
+    published_at: float | None = None
+
+
+def new_event(routing_key: str, message: str) -> Event:
+    return Event(id=uuid.uuid4().hex, routing_key=routing_key, body=message.encode("utf-8"), published_at=time.time())
+
+
+class EventTransport(ABC):
+    """
+    Interfaz de transporte de eventos. Se publica a una cola por su routing
+    key (como en el exchange por defecto de RabbitMQ) y se consume de ella.
+    """
+
+    @abstractmethod
+    def publish(self, routing_key: str, message: str):
+        pass
+
+    @abstractmethod
+    def consume_batches(self, queue_name: str, on_batch, batch_size: int, max_wait: float, stop: threading.Event | None = None):
+        """
+        Bloquea el hilo actual entregando a `on_batch` lotes de hasta
+        `batch_size` eventos, o los que hayan llegado `max_wait` segundos
+        después del primero. Los eventos se confirman solo cuando `on_batch`
+        termina sin error; si falla, el lote se vuelve a entregar hasta
+        CONSUMER_MAX_ATTEMPTS veces y luego se mueve a la cola '<cola>.dead'.
+        """
+
+    @abstractmethod
+    def delete_queue(self, queue_name: str):
+        """Elimina la cola y sus mensajes pendientes, si existe."""
+
+    def consume(self, queue_name: str, on_message, stop: threading.Event | None = None):
+        """Entrega cada mensaje (bytes) a `on_message`, de a uno."""
+        self.consume_batches(
+            queue_name, lambda events: [on_message(event.body) for event in events], batch_size=1, max_wait=0, stop=stop
+        )
+
+
+class AmqpTransport(EventTransport):
+    def _connection_parameters(self, timeout: float | None = None):
+        timeouts = {}
+        if timeout is not None:
+            timeouts = {
+                "socket_timeout": timeout,
+                "stack_timeout": timeout,
+                "blocked_connection_timeout": timeout,
+            }
+        return pika.ConnectionParameters(
+            host=RABBITMQ_HOST,
+            port=RABBITMQ_PORT,
+            credentials=pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASSWORD),
+            **timeouts
+        )
+
+    def publish(self, routing_key: str, message: str):
+        check("broker")
+        event = new_event(routing_key, message)
+        try:
+            # El tiempo restante del request acota la conexión y la publicación
+            connection = pika.BlockingConnection(self._connection_parameters(remaining()))
+            channel = connection.channel()
+
+            channel.queue_declare(queue=routing_key, durable=True)
+
+            channel.basic_publish(
+                exchange='',
+                routing_key=routing_key,
+                body=event.body,
+                properties=pika.BasicProperties(
+                    delivery_mode=2,
+                    message_id=event.id,
+                    timestamp=int(event.published_at),
+                    headers={"published_at_ms": int(event.published_at * 1000)},
+                )
+            )
+
+            connection.close()
+        except (pika.exceptions.AMQPError, OSError) as e:
+            if expired():
+                record_expiry("broker")
+                raise DeadlineExceeded("broker") from e
+            raise
+
+    def delete_queue(self, queue_name: str):
+        connection = pika.BlockingConnection(self._connection_parameters())
+        try:
+            connection.channel().queue_delete(queue=queue_name)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _to_event(method, properties, body) -> Event:
+        headers = properties.headers or {}
+        published_at = None
+        if "published_at_ms" in headers:
+            published_at = headers["published_at_ms"] / 1000
+        elif properties.timestamp is not None:
+            published_at = float(properties.timestamp)
+        # Los mensajes sin message_id no se pueden deduplicar: dos mensajes
+        # iguales pueden ser eventos distintos, así que cada uno recibe un id propio
+        event_id = properties.message_id or uuid.uuid4().hex
+        return Event(id=event_id, routing_key=method.routing_key, body=body, published_at=published_at)
+
+    def consume_batches(self, queue_name: str, on_batch, batch_size: int, max_wait: float, stop: threading.Event | None = None):
+        connection = pika.BlockingConnection(self._connection_parameters())
+        channel = connection.channel()
+
+        channel.queue_declare(queue=queue_name, durable=True)
+        # RabbitMQ no entrega más mensajes sin confirmar que los que caben en un lote
+        channel.basic_qos(prefetch_count=batch_size)
+
+        dead_letter_queue = f"{queue_name}.dead"
+        channel.queue_declare(queue=dead_letter_queue, durable=True)
+
+        # Intentos fallidos por mensaje; los mensajes sin message_id se reconocen por su contenido
+        attempts = {}
+        batch = []
+        keys = []
+        last_tag = None
+        first_at = None
+        try:
+            for method, properties, body in channel.consume(queue_name, inactivity_timeout=max(max_wait, 0.1)):
+                if method is not None:
+                    batch.append(self._to_event(method, properties, body))
+                    keys.append(properties.message_id or hashlib.sha1(body).hexdigest())
+                    last_tag = method.delivery_tag
+                    first_at = first_at or time.monotonic()
+
+                if batch and (len(batch) >= batch_size or time.monotonic() - first_at >= max_wait):
+                    try:
+                        on_batch(batch)
+                    except Exception as e:
+                        for key in keys:
+                            attempts[key] = attempts.get(key, 0) + 1
+                        if max(attempts[key] for key in keys) < CONSUMER_MAX_ATTEMPTS:
+                            logger.warning(f"Lote de '{queue_name}' rechazado, se reintentará: {e}")
+                            channel.basic_nack(delivery_tag=last_tag, multiple=True, requeue=True)
+                            connection.sleep(CONSUMER_RETRY_DELAY_MS / 1000)
+                        else:
+                            logger.error(
+                                f"Lote de {len(batch)} eventos de '{queue_name}' movido a '{dead_letter_queue}' "
+                                f"tras {CONSUMER_MAX_ATTEMPTS} intentos: {e}"
+                            )
+                            for event in batch:
+                                channel.basic_publish(
+                                    exchange='',
+                                    routing_key=dead_letter_queue,
+                                    body=event.body,
+                                    properties=pika.BasicProperties(delivery_mode=2, message_id=event.id),
+                                )
+                            channel.basic_ack(delivery_tag=last_tag, multiple=True)
+                            for key in keys:
+                                attempts.pop(key, None)
+                    else:
+                        channel.basic_ack(delivery_tag=last_tag, multiple=True)
+                        for key in keys:
+                            attempts.pop(key, None)
+                    batch = []
+                    keys = []
+                    first_at = None
+
+                if stop is not None and stop.is_set() and not batch:
+                    break
+        finally:
+            channel.cancel()
+            connection.close()
+
+
+@dataclass
+class _QueueState:
+    events: queue.Queue
+    consumers: int = 0
+    publishers: int = 0
+
+    def idle(self) -> bool:
+        return self.consumers == 0 and self.publishers == 0 and self.events.empty()
+
+
+class InProcessTransport(EventTransport):
+    """
+    Bus de eventos en memoria con la misma semántica de colas que el
+    exchange por defecto de RabbitMQ: cada routing key es una cola que se
+    crea en el primer uso y cuyos mensajes se reparten entre sus consumidores.
+
+    Cada cola guarda como máximo `max_buffer` mensajes; al llenarse, quien
+    publica espera (backpressure) hasta que haya espacio o se agote el
+    deadline del request. Las colas vacías y sin consumidores se descartan,
+    y nunca hay más de `max_queues` a la vez. Los eventos no se comparten
+    entre workers ni sobreviven a un reinicio.
+    """
+
+    def __init__(self, max_buffer: int = EVENT_BUS_MAX_BUFFER, max_queues: int = EVENT_BUS_MAX_QUEUES):
+        self.max_buffer = max_buffer
+        self.max_queues = max_queues
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, name: str, role: str) -> _QueueState:
+        with self._lock:
+            state = self._queues.get(name)
+            if state is None:
+                if len(self._queues) >= self.max_queues:
+                    self._discard_idle()
+                if len(self._queues) >= self.max_queues:
+                    raise RuntimeError(f"In-process event bus has reached its limit of {self.max_queues} queues")
+                state = self._queues[name] = _QueueState(queue.Queue(maxsize=self.max_buffer))
+            setattr(state, role, getattr(state, role) + 1)
+            return state
+
+    def _release(self, name: str, state: _QueueState, role: str):
+        with self._lock:
+            setattr(state, role, getattr(state, role) - 1)
+            if state.idle() and self._queues.get(name) is state:
+                del self._queues[name]
+
+    def _discard_idle(self):
+        for name in [name for name, state in self._queues.items() if state.idle()]:
+            del self._queues[name]
+
+    def publish(self, routing_key: str, message: str):
+        check("broker")
+        timeout = remaining()
+        state = self._acquire(routing_key, "publishers")
+        try:
+            state.events.put(
+                new_event(routing_key, message), timeout=None if timeout is None else max(timeout, 0)
+            )
+        except queue.Full:
+            record_expiry("broker")
+            raise DeadlineExceeded("broker")
+        finally:
+            self._release(routing_key, state, "publishers")
+
+    def consume_batches(self, queue_name: str, on_batch, batch_size: int, max_wait: float, stop: threading.Event | None = None):
+        state = self._acquire(queue_name, "consumers")
+        events = state.events
+        try:
+            while stop is None or not stop.is_set():
+                try:
+                    batch = [events.get(timeout=0.1)]
+                except queue.Empty:
+                    continue
+                flush_at = time.monotonic() + max_wait
+                while len(batch) < batch_size:
+                    try:
+                        batch.append(events.get(timeout=max(flush_at - time.monotonic(), 0)))
+                    except queue.Empty:
+                        break
+
+                # Un lote fallido se reintenta desde este consumidor, sin devolverlo
+                # a la cola (que podría estar llena)
+                for attempt in range(1, CONSUMER_MAX_ATTEMPTS + 1):
+                    try:
+                        on_batch(batch)
+                        break
+                    except Exception as e:
+                        if stop is not None and stop.is_set():
+                            return
+                        if attempt == CONSUMER_MAX_ATTEMPTS:
+                            self._dead_letter(queue_name, batch, e)
+                        else:
+                            logger.warning(f"Lote de '{queue_name}' rechazado, se reintentará: {e}")
+                            time.sleep(CONSUMER_RETRY_DELAY_MS / 1000)
+        finally:
+            self._release(queue_name, state, "consumers")
+
+    def _dead_letter(self, queue_name: str, batch: list, error: Exception):
+        dead_letter_queue = f"{queue_name}.dead"
+        logger.error(
+            f"Lote de {len(batch)} eventos de '{queue_name}' movido a '{dead_letter_queue}' "
+            f"tras {CONSUMER_MAX_ATTEMPTS} intentos: {error}"
+        )
+        state = self._acquire(dead_letter_queue, "publishers")
+        try:
+            for event in batch:
+                try:
+                    state.events.put_nowait(event)
+                except queue.Full:
+                    logger.error(f"'{dead_letter_queue}' está llena, se descarta el evento {event.id}")
+        finally:
+            self._release(dead_letter_queue, state, "publishers")
+
+    def delete_queue(self, queue_name: str):
+        with self._lock:
+            self._queues.pop(queue_name, None)
+
+    def pending(self, queue_name: str) -> int:
+        with self._lock:
+            state = self._queues.get(queue_name)
+            return state.events.qsize() if state is not None else 0
+
+
+TRANSPORTS = {
+    "amqp": AmqpTransport,
+    "memory": InProcessTransport,
+}
+
+_transport_lock = threading.Lock()
+_transport = None
+_transport_pid = None
+
+
+def get_transport() -> EventTransport:
+    """
+    Retorna el transporte configurado en EVENT_TRANSPORT, creado en el primer
+    uso dentro de cada proceso.
+    """
+    global _transport, _transport_pid
+    pid = os.getpid()
+    if _transport is None or _transport_pid != pid:
+        with _transport_lock:
+            if _transport is None or _transport_pid != pid:
+                if EVENT_TRANSPORT not in TRANSPORTS:
+                    raise ValueError(f"Unknown EVENT_TRANSPORT '{EVENT_TRANSPORT}'")
+                _transport = TRANSPORTS[EVENT_TRANSPORT]()
+                _transport_pid = pid
+    return _transport
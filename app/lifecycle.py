@@ -0,0 +1,75 @@
+import logging
+import os
+import signal
+import threading
+
+import anyio.to_thread
+
+from app.db import close_client
+from app.directory import ensure_indexes
+from app.rabbitmq_consumer import start_consumers, stop_consumers
+
+logger = logging.getLogger(__name__)
+
+# Tamaño del threadpool donde corren los endpoints síncronos (MongoDB, bcrypt, RabbitMQ)
+THREADPOOL_SIZE = os.environ.get("THREADPOOL_SIZE")
+
+# Segundos que el worker sigue atendiendo tras SIGTERM, respondiendo 503 en
+# /health/ready, para que el balanceador lo saque antes de cerrar el socket.
+# Debe ser menor que GRACEFUL_TIMEOUT.
+DRAIN_DELAY_SECONDS = float(os.environ.get("DRAIN_DELAY_SECONDS", "5"))
+
+_draining = threading.Event()
+
+
+def is_draining() -> bool:
+    return _draining.is_set()
+
+
+def _install_drain_handler():
+    # signal.signal solo se puede usar desde el hilo principal (no es el caso en los tests)
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def hand_off(signum, frame):
+        if callable(previous):
+            previous(signum, frame)
+        elif previous == signal.SIG_DFL:
+            # Terminar como si el handler nunca se hubiera instalado
+            signal.signal(signum, signal.SIG_DFL)
+            os.kill(os.getpid(), signum)
+
+    def handle_sigterm(signum, frame):
+        # Un segundo SIGTERM (el del timer o uno externo) cierra de inmediato
+        if _draining.is_set() or DRAIN_DELAY_SECONDS <= 0:
+            _draining.set()
+            hand_off(signum, frame)
+            return
+
+        # Marcar el worker como no listo y, pasada la espera, reenviar la señal
+        # al proceso para que el cierre corra en el hilo principal, que es el
+        # único donde se pueden manejar señales
+        logger.info(f"SIGTERM recibido, drenando durante {DRAIN_DELAY_SECONDS} s antes de cerrar")
+        _draining.set()
+        timer = threading.Timer(DRAIN_DELAY_SECONDS, os.kill, args=(os.getpid(), signum))
+        timer.daemon = True
+        timer.start()
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+
+async def startup():
+    if THREADPOOL_SIZE:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = int(THREADPOOL_SIZE)
+    _install_drain_handler()
+    start_consumers()
+    # Los índices se crean en segundo plano para no demorar el arranque del worker
+    threading.Thread(target=ensure_indexes, daemon=True).start()
+
+
+async def shutdown():
+    _draining.set()
+    stop_consumers()
+    close_client()
@@ -1,4 +1,3 @@
-from pymongo import MongoClient
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import professors, students, admins
@@ -6,12 +5,18 @@ from app.routers import professors, students, admins
 import logging
 
 from fastapi import FastAPI
-from pymongo import MongoClient
 
-from app.routers import admins, auth, professors, students
+from app import lifecycle
+from app.deadline import DeadlineMiddleware, expiry_histogram
+from app.rabbitmq_consumer import consumer_metrics
+from app.routers import admins, auth, health, professors, students, users
 
 app = FastAPI()
 
+# Cada request recibe un presupuesto de tiempo que se propaga a MongoDB y RabbitMQ.
+# Se registra antes que CORS para que sus 503 también lleven los headers de CORS.
+app.add_middleware(DeadlineMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[""],  # Permitir todas las orígenes, puedes restringir esto según sea necesario
@@ -20,10 +25,38 @@ app.add_middleware(
     allow_headers=["*"],  # Permitir todos los encabezados
 )
 
-mongodb_client = MongoClient("user_service_mongodb", 27017)
-user_service_db = mongodb_client.user_service
+# Las conexiones (MongoDB, threadpool) se crean dentro de cada worker, nunca antes del fork
+app.add_event_handler("startup", lifecycle.startup)
+app.add_event_handler("shutdown", lifecycle.shutdown)
 
 app.include_router(professors.router, prefix="/api/v1/professors", tags=["Professors"])
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authenticate"])
 app.include_router(students.router, prefix="/api/v1/students", tags=["Students"])
 app.include_router(admins.router, prefix="/api/v1/admins", tags=["Admins"])
+app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
+
+
+@app.get("/metrics/deadlines", tags=["Metrics"])
+def deadline_metrics():
+    """
+    Endpoint para consultar el histograma de deadlines expirados.
+
+    Retorna:
+    - **buckets_ms:** Los límites superiores de cada bucket, en milisegundos desde el inicio del request.
+    - **series:** Las expiraciones agrupadas por ruta y etapa ('mongo', 'broker' o 'request').
+    """
+    return expiry_histogram()
+
+
+@app.get("/metrics/events", tags=["Metrics"])
+def event_metrics():
+    """
+    Endpoint para consultar las métricas de los consumidores de eventos de este worker.
+
+    Retorna:
+    - **handlers:** Por cada handler, los lotes y eventos procesados, duplicados descartados, fallos,
+      eventos por segundo y el lag (segundos entre la publicación y el procesamiento).
+    - **event_counters:** La cantidad de entidades afectadas por tipo de evento.
+    """
+    return consumer_metrics()
@@ -1,9 +1,10 @@
 from typing import Literal, Optional
 
-import bcrypt
 from bson import ObjectId
 from pydantic import BaseModel, Field
 
+from app import password_policy
+
 
 class User(BaseModel):
     id: str | None = None
@@ -19,9 +20,7 @@ class User(BaseModel):
         super().__init__(**kargs)
 
     def hash_password(self):
-        self.password = bcrypt.hashpw(
-            self.password.encode("utf-8"), bcrypt.gensalt()
-        ).decode("utf-8")
+        self.password = password_policy.hash_password(self.password)
 
     class Config:
         orm_mode = True
@@ -51,3 +50,10 @@ class ChangePassword(BaseModel):
     email: str
     old_password: str
     new_password: str
+
+
+class BulkStatusChange(BaseModel):
+    ids: list[str] | None = None
+    filter: dict[str, str] | None = None
+    status: Literal["active", "inactive"] = "inactive"
+    dry_run: bool = False
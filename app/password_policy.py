@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+import time
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+# Costo (log2 de rondas) con que se generan los hashes nuevos. Al cambiarlo,
+# los hashes existentes se actualizan en el siguiente login de cada usuario.
+BCRYPT_COST = int(os.environ.get("BCRYPT_COST", "12"))
+
+# Logins por segundo en hora punta, usados para proyectar el uso de CPU
+LOGIN_PEAK_RATE = float(os.environ.get("LOGIN_PEAK_RATE", "50"))
+
+# Costo con que se mide la velocidad de bcrypt en este equipo
+CALIBRATION_COST = 6
+
+_calibration_lock = threading.Lock()
+_seconds_at_calibration_cost = None
+
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_COST)).decode("utf-8")
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def hash_cost(hashed: str) -> int | None:
+    # Formato: $2b$<costo>$<salt y hash>
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed: str) -> bool:
+    return hash_cost(hashed) != BCRYPT_COST
+
+
+def rehash_password(collection, user_id, password: str, old_hash: str):
+    """
+    Vuelve a hashear la contraseña con el costo actual. Se ejecuta en
+    segundo plano tras un login exitoso, y solo reemplaza el hash si nadie
+    cambió la contraseña mientras tanto.
+    """
+    try:
+        collection.update_one(
+            {"_id": user_id, "password": old_hash},
+            {"$set": {"password": hash_password(password)}},
+        )
+    except Exception as e:
+        # El hash anterior sigue siendo válido; se reintenta en el próximo login
+        logger.warning(f"No se pudo actualizar el hash de {user_id}: {e}")
+
+
+def estimated_check_seconds(cost: int) -> float:
+    """
+    Tiempo de CPU estimado de un checkpw con el costo dado. Se mide una vez
+    con un costo bajo y se escala, ya que cada punto de costo duplica el trabajo.
+    Se usa el reloj de CPU del hilo para no contar el trabajo de otros requests.
+    """
+    global _seconds_at_calibration_cost
+    with _calibration_lock:
+        if _seconds_at_calibration_cost is None:
+            hashed = bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds=CALIBRATION_COST))
+            samples = []
+            for _ in range(3):
+                start = time.thread_time()
+                bcrypt.checkpw(b"calibration", hashed)
+                samples.append(time.thread_time() - start)
+            _seconds_at_calibration_cost = min(samples)
+    return _seconds_at_calibration_cost * 2 ** (cost - CALIBRATION_COST)
+
+
+def cost_report(collections: dict, peak_rate: float = LOGIN_PEAK_RATE) -> dict:
+    """
+    Distribución de costos de los hashes almacenados en `collections`
+    (nombre -> colección) y CPU de login proyectada a `peak_rate` logins por segundo.
+    """
+    pipeline = [
+        {"$match": {"password": {"$type": "string"}}},
+        {"$group": {"_id": {"$arrayElemAt": [{"$split": ["$password", {"$literal": "$"}]}, 2]}, "count": {"$sum": 1}}},
+    ]
+
+    by_collection = {}
+    totals = {}
+    for name, collection in collections.items():
+        distribution = {}
+        for row in collection.aggregate(pipeline):
+            cost = int(row["_id"]) if row["_id"] and row["_id"].isdigit() else None
+            distribution[str(cost)] = distribution.get(str(cost), 0) + row["count"]
+            totals[cost] = totals.get(cost, 0) + row["count"]
+        by_collection[name] = distribution
+
+    # Los hashes sin costo reconocible se proyectan con el costo objetivo
+    users = sum(totals.values())
+    current_seconds = sum(
+        count * estimated_check_seconds(cost if cost is not None else BCRYPT_COST) for cost, count in totals.items()
+    )
+    average_check = current_seconds / users if users else estimated_check_seconds(BCRYPT_COST)
+
+    return {
+        "target_cost": BCRYPT_COST,
+        "users": users,
+        "pending_rehash": sum(count for cost, count in totals.items() if cost != BCRYPT_COST),
+        "cost_distribution": {str(cost): count for cost, count in sorted(totals.items(), key=lambda item: (item[0] is None, item[0] or 0))},
+        "by_collection": by_collection,
+        "peak_login_rate": peak_rate,
+        "projected_login_cpu_seconds_per_second": {
+            "current": average_check * peak_rate,
+            "target": estimated_check_seconds(BCRYPT_COST) * peak_rate,
+        },
+    }
@@ -1,21 +1,232 @@
-import pika # type: ignore
 import json
+import logging
+import os
 import threading
+import time
+from collections import Counter, OrderedDict
 
-def callback(ch, method, properties, body):
-    message = json.loads(body)
-    print(f"Recibido mensaje: {message}")
+from app.event_bus import get_transport
 
-def start_consuming(queue_name):
-    connection = pika.BlockingConnection(pika.ConnectionParameters('user_service_rabbitmq', 5672, '/', pika.PlainCredentials('user', 'password')))
-    channel = connection.channel()
+logger = logging.getLogger(__name__)
+
+# Un lote se entrega al llegar a CONSUMER_BATCH_SIZE eventos o tras CONSUMER_MAX_WAIT_MS
+CONSUMER_BATCH_SIZE = int(os.environ.get("CONSUMER_BATCH_SIZE", "100"))
+CONSUMER_MAX_WAIT_MS = int(os.environ.get("CONSUMER_MAX_WAIT_MS", "200"))
+
+# Cantidad de ids de eventos recordados por handler para descartar duplicados
+CONSUMER_SEEN_SET_SIZE = int(os.environ.get("CONSUMER_SEEN_SET_SIZE", "100000"))
+
+# Registra cada evento recibido en el log (nivel DEBUG); desactivado por
+# defecto para no frenar a los consumidores en importaciones masivas
+CONSUMER_LOG_EVENTS = os.environ.get("CONSUMER_LOG_EVENTS", "false").lower() == "true"
+
+# Espera antes de reconectar un consumidor cuya conexión se cayó
+CONSUMER_RECONNECT_DELAY_MS = int(os.environ.get("CONSUMER_RECONNECT_DELAY_MS", "5000"))
+
+# Una cola por entidad y acción (por ejemplo, 'student.created'); los ids van en el mensaje
+EVENT_ENTITIES = ("student", "professor", "administrative")
+EVENT_ACTIONS = ("created", "updated", "deleted")
+EVENT_QUEUES = [f"{entity}.{action}" for entity in EVENT_ENTITIES for action in EVENT_ACTIONS]
+
+
+class SeenSet:
+    """Conjunto acotado que olvida los ids más antiguos al llenarse."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self._ids
+
+    def add(self, event_id: str):
+        self._ids[event_id] = None
+        self._ids.move_to_end(event_id)
+        while len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+
+class HandlerStats:
+    def __init__(self):
+        self.batches = 0
+        self.events = 0
+        self.duplicates = 0
+        self.failures = 0
+        self.busy_seconds = 0.0
+        self.last_lag_seconds = None
+        self.max_lag_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "events": self.events,
+            "duplicates": self.duplicates,
+            "failures": self.failures,
+            "events_per_second": self.events / self.busy_seconds if self.busy_seconds else None,
+            "last_lag_seconds": self.last_lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+        }
+
+
+class EventPipeline:
+    """
+    Consume eventos en lotes y los despacha a los handlers registrados.
+
+    Cada handler recibe solo los eventos de su interés que todavía no
+    procesó (deduplicados por id), y el lote se confirma al transporte
+    únicamente cuando todos los handlers terminaron bien. Si uno falla, el
+    lote se reintenta y los handlers que ya lo procesaron lo descartan como
+    duplicado.
+    """
+
+    def __init__(self, batch_size: int = CONSUMER_BATCH_SIZE, max_wait: float = CONSUMER_MAX_WAIT_MS / 1000, seen_set_size: int = CONSUMER_SEEN_SET_SIZE):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.seen_set_size = seen_set_size
+        self._handlers = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, handler, routing_prefix: str = ""):
+        """
+        Registra `handler(events)` para los eventos cuya routing key empieza
+        con `routing_prefix` (todos, por defecto). Los consumidores de distintas
+        colas pueden llamar al mismo handler en paralelo.
+        """
+        self._handlers[name] = {
+            "handler": handler,
+            "routing_prefix": routing_prefix,
+            "seen": SeenSet(self.seen_set_size),
+            "stats": HandlerStats(),
+        }
+
+    def handle_batch(self, events: list):
+        # El lock protege solo los seen-sets y las estadísticas; los handlers corren
+        # sin él para que los consumidores de distintas colas no se bloqueen entre sí
+        for name, entry in list(self._handlers.items()):
+            stats = entry["stats"]
+            pending = {}
+            with self._lock:
+                for event in events:
+                    if not event.routing_key.startswith(entry["routing_prefix"]):
+                        continue
+                    if event.id in entry["seen"] or event.id in pending:
+                        stats.duplicates += 1
+                        continue
+                    pending[event.id] = event
+            if not pending:
+                continue
+
+            start = time.perf_counter()
+            try:
+                entry["handler"](list(pending.values()))
+            except Exception:
+                with self._lock:
+                    stats.failures += 1
+                logger.exception(f"El handler '{name}' falló procesando {len(pending)} eventos")
+                raise
+            elapsed = time.perf_counter() - start
+
+            published = [event.published_at for event in pending.values() if event.published_at is not None]
+            with self._lock:
+                stats.busy_seconds += elapsed
+                stats.batches += 1
+                stats.events += len(pending)
+                for event_id in pending:
+                    entry["seen"].add(event_id)
+                if published:
+                    stats.last_lag_seconds = time.time() - min(published)
+                    stats.max_lag_seconds = max(stats.max_lag_seconds, stats.last_lag_seconds)
 
-    channel.queue_declare(queue=queue_name, durable=True)
-    channel.basic_consume(queue=queue_name, on_message_callback=callback, auto_ack=True)
+    def run(self, queue_name: str, stop: threading.Event | None = None):
+        logger.debug(f"Esperando mensajes en la cola '{queue_name}'...")
+        get_transport().consume_batches(queue_name, self.handle_batch, self.batch_size, self.max_wait, stop)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "batch_size": self.batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "handlers": {name: entry["stats"].as_dict() for name, entry in self._handlers.items()},
+            }
+
+
+def decode(body: bytes):
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body.decode("utf-8")
+
+
+def log_events(events):
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    for event in events:
+        logger.debug(f"Recibido mensaje: {decode(event.body)}")
+
+
+# Conteo de entidades afectadas por tipo de evento (por ejemplo, ('student', 'created'))
+event_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def count_events(events):
+    for event in events:
+        entity, _, action = event.routing_key.rpartition(".")
+        message = decode(event.body)
+        # Los eventos masivos traen la lista de ids afectados
+        affected = len(message["ids"]) if isinstance(message, dict) and "ids" in message else 1
+        with _counters_lock:
+            event_counters[(entity, action)] += affected
+
+
+pipeline = EventPipeline()
+if CONSUMER_LOG_EVENTS:
+    pipeline.register("log", log_events)
+pipeline.register("event_counters", count_events)
+
+_consumers_lock = threading.Lock()
+_consumers = set()
+_stop = threading.Event()
+
+
+def start_consuming(queue_name):
+    try:
+        # Si la conexión se cae, se reintenta mientras el worker siga activo
+        while not _stop.is_set():
+            try:
+                pipeline.run(queue_name, _stop)
+            except Exception as e:
+                logger.warning(f"El consumidor de '{queue_name}' se detuvo, se reconectará: {e}")
+                _stop.wait(CONSUMER_RECONNECT_DELAY_MS / 1000)
+    finally:
+        with _consumers_lock:
+            _consumers.discard(queue_name)
 
-    print(f"Esperando mensajes en la cola '{queue_name}'...")
-    channel.start_consuming()
 
 def run_consumer(queue_name):
-    consumer_thread = threading.Thread(target=start_consuming, args=(queue_name,))
+    # Un solo consumidor por cola y proceso basta, ya que consume en lotes
+    with _consumers_lock:
+        if queue_name in _consumers:
+            return
+        _consumers.add(queue_name)
+    consumer_thread = threading.Thread(target=start_consuming, args=(queue_name,), daemon=True)
     consumer_thread.start()
+
+
+def start_consumers():
+    """Lanza un consumidor por cada cola de EVENT_QUEUES. Se llama una vez por worker al iniciar."""
+    _stop.clear()
+    for queue_name in EVENT_QUEUES:
+        run_consumer(queue_name)
+    logger.info(f"Consumidores iniciados para {len(EVENT_QUEUES)} colas de eventos")
+
+
+def stop_consumers():
+    _stop.set()
+
+
+def consumer_metrics() -> dict:
+    metrics = pipeline.metrics()
+    with _counters_lock:
+        metrics["event_counters"] = {f"{entity}.{action}": count for (entity, action), count in sorted(event_counters.items())}
+    return metrics
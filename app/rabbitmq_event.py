@@ -1,23 +1,5 @@
-import pika # type: ignore
+from app.event_bus import get_transport
 
 def send_message_to_rabbitmq(queue_name: str, message: str):
-    credentials = pika.PlainCredentials('user', 'password')
-    connection = pika.BlockingConnection(
-        pika.ConnectionParameters(
-            host='user_service_rabbitmq',
-            port=5672,
-            credentials=credentials
-            )
-    )
-    channel = connection.channel()
-
-    channel.queue_declare(queue=queue_name, durable=True)
-
-    channel.basic_publish(
-        exchange='',
-        routing_key=queue_name,
-        body=message,
-        properties=pika.BasicProperties(delivery_mode=2)
-    )
-    
-    connection.close()
\ No newline at end of file
+    # El transporte (RabbitMQ o bus en proceso) se elige con EVENT_TRANSPORT
+    get_transport().publish(queue_name, message)
@@ -1,15 +1,15 @@
+import json
+
 from fastapi import APIRouter, HTTPException
-from pymongo import MongoClient
 from bson import ObjectId
-from app.models import Admin
-from app.rabbitmq_consumer import run_consumer
+from app.db import get_database
+from app.deadline import DeadlineExceeded, mongo_deadline
+from app.bulk import bulk_change_status
+from app.models import BulkStatusChange, Admin
 from app.rabbitmq_event import send_message_to_rabbitmq
 
 router = APIRouter()
 
-mongodb_client = MongoClient("user_service_mongodb", 27017)
-user_service_db = mongodb_client.user_service
-
 @router.get("/")
 def list_all_admins():
     """
@@ -19,8 +19,11 @@ def list_all_admins():
     - Una lista de todos los administradores con estado 'active'.
     """
     try:
-        admins = user_service_db.admins.find({"status":"active"})
-        return [Admin(**admin) for admin in admins]
+        with mongo_deadline():
+            admins = get_database().admins.find({"status":"active"})
+            return [Admin(**admin) for admin in admins]
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -42,20 +45,22 @@ def register_new_admin(admin: Admin):
     - El ID del nuevo administrador registrado.
     """
     try:
-        res_email = user_service_db.admins.find_one({"email": admin.email})
+        with mongo_deadline():
+            res_email = get_database().admins.find_one({"email": admin.email})
         if res_email is None:
             admin.hash_password()
             admin_dict = admin.dict()
-            result = user_service_db.admins.insert_one(admin_dict)
-
-            message = f"Administrative {str(result.inserted_id)} created"
-            send_message_to_rabbitmq(f"administrative.{str(result.inserted_id)}.created", message)
+            with mongo_deadline():
+                result = get_database().admins.insert_one(admin_dict)
 
-            run_consumer(f"administrative.{str(result.inserted_id)}.created")
+            message = json.dumps({"id": str(result.inserted_id), "message": f"Administrative {str(result.inserted_id)} created"})
+            send_message_to_rabbitmq("administrative.created", message)
 
             return {"inserted_id": str(result.inserted_id)}
         else:
             raise Exception("email already registered.")
+    except DeadlineExceeded:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as ve:
@@ -79,13 +84,16 @@ def get_admin_information(admin_id: str):
     """
     admin_dict = {}
     try:
-        admin_dict = user_service_db.admins.find_one(
-            {"_id": ObjectId(admin_id),"status":"active"},
-            {"password": 0},  # Exclude the password field
-        )
+        with mongo_deadline():
+            admin_dict = get_database().admins.find_one(
+                {"_id": ObjectId(admin_id),"status":"active"},
+                {"password": 0},  # Exclude the password field
+            )
         if admin_dict is None:
             raise HTTPException(status_code=404, detail="Admin not found")
         return Admin(**admin_dict)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(f"{e}: {admin_dict}"))
 
@@ -109,17 +117,18 @@ def update_admin_information(admin_id: str, admin: Admin):
     try:
         admin.hash_password()
         update_data = admin.dict(exclude={"id"})
-        result = user_service_db.admins.update_one({"_id": ObjectId(admin_id)}, {"$set": update_data})
+        with mongo_deadline():
+            result = get_database().admins.update_one({"_id": ObjectId(admin_id)}, {"$set": update_data})
 
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Admin not found or no changes made")
 
-        message = f"Administrative {str(admin_id)} updated"
-        send_message_to_rabbitmq(f"administrative.{str(admin_id)}.updated", message)
-
-        run_consumer(f"administrative.{str(admin_id)}.updated")
+        message = json.dumps({"id": str(admin_id), "message": f"Administrative {str(admin_id)} updated"})
+        send_message_to_rabbitmq("administrative.updated", message)
 
         return {"modified_count": result.modified_count}
+    except DeadlineExceeded:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
@@ -138,13 +147,42 @@ def delete_admin(admin_id: str):
     """
     try:
         # Using soft delete instead of hard delete, so we just update the status field
-        result = user_service_db.admins.update_one({"_id": ObjectId(admin_id)}, {"$set": {"status": "inactive"}})
-
-        message = f"Administrative {str(admin_id)} deleted"
-        send_message_to_rabbitmq(f"administrative.{str(admin_id)}.deleted", message)
+        with mongo_deadline():
+            result = get_database().admins.update_one({"_id": ObjectId(admin_id)}, {"$set": {"status": "inactive"}})
 
-        run_consumer(f"administrative.{str(admin_id)}.deleted")
+        message = json.dumps({"id": str(admin_id), "message": f"Administrative {str(admin_id)} deleted"})
+        send_message_to_rabbitmq("administrative.deleted", message)
 
         return {"deleted": result.acknowledged}
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/bulk/status")
+def bulk_update_admins_status(change: BulkStatusChange):
+    """
+    Endpoint para cambiar el estado de muchos administradores en una sola operación
+    (por ejemplo, la eliminación lógica de un grupo completo).
+
+    Parámetros:
+    - **ids:** Lista de IDs de los administradores a modificar.
+    - **filter:** No se admiten filtros para administradores; se deben indicar los **ids**.
+    - **status:** El nuevo estado, 'inactive' por defecto.
+    - **dry_run:** Si es true, solo se informa cuántos administradores serían afectados.
+
+    Retorna:
+    - **matched_count:** La cantidad de administradores que cambian de estado.
+    - **modified_count:** La cantidad de registros modificados.
+    - **events_published:** La cantidad de eventos por lote enviados a RabbitMQ.
+    - **unpublished_ids:** Los IDs modificados (o que pudieron modificarse antes de agotarse el tiempo) cuyo evento no se publicó.
+    - **completed:** false si se agotó el tiempo antes de procesar todos los administradores; el resto se puede reintentar.
+    """
+    try:
+        return bulk_change_status("admins", "administrative", change, allowed_filters=set())
+    except DeadlineExceeded:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
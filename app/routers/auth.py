@@ -1,22 +1,20 @@
 from datetime import datetime, timedelta
-import bcrypt
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from pymongo import MongoClient
 from dotenv import load_dotenv
 from pathlib import Path
 import os
 import logging
-from app.models import Admin, Auth, ChangePassword, Professor, Student
+from app import password_policy
+from app.db import get_database
+from app.deadline import DeadlineExceeded, mongo_deadline
+from app.directory import ROLE_COLLECTIONS, collection_for, find_user_by_email, to_model
+from app.models import Auth, ChangePassword
 from pydantic import BaseModel
 
 router = APIRouter()
 
-# Conexión a MongoDB
-mongodb_client = MongoClient("user_service_mongodb", 27017)
-user_service_db = mongodb_client.user_service
-
 # Cargar variables de entorno
 env_path = Path('.') / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -51,7 +49,7 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         )
 
 @router.post("/login")
-def authentication(user: Auth):
+def authentication(user: Auth, background_tasks: BackgroundTasks):
     """
     Endpoint para autenticar a un usuario basado en email y contraseña.
 
@@ -66,27 +64,29 @@ def authentication(user: Auth):
         - **role:** El rol del usuario autenticado.
         - **exp:** La fecha de expiración del token.
     - **token_type:** Tipo de token ('bearer').
+
+    Si el hash almacenado no usa el costo de bcrypt configurado, se vuelve a
+    generar en segundo plano con la contraseña recibida.
     """
     try:
         # Buscar usuario en las colecciones
-        response_student = user_service_db.students.find_one({"email": user.email})
-        response_admin = user_service_db.admins.find_one({"email": user.email})
-        response_professor = user_service_db.professors.find_one({"email": user.email})
+        with mongo_deadline():
+            response_user = find_user_by_email(user.email, include_password=True)
 
         data = None
 
-        if response_student:
-            user_student_dict = Student(**response_student)
-            if bcrypt.checkpw(user.password.encode("utf-8"), user_student_dict.password.encode("utf-8")):
-                data = {"email": user_student_dict.email, "role": user_student_dict.role}
-        elif response_admin:
-            user_admin_dict = Admin(**response_admin)
-            if bcrypt.checkpw(user.password.encode("utf-8"), user_admin_dict.password.encode("utf-8")):
-                data = {"email": user_admin_dict.email, "role": user_admin_dict.role}
-        elif response_professor:
-            user_professor_dict = Professor(**response_professor)
-            if bcrypt.checkpw(user.password.encode("utf-8"), user_professor_dict.password.encode("utf-8")):
-                data = {"email": user_professor_dict.email, "role": user_professor_dict.role}
+        if response_user:
+            user_dict = to_model(response_user)
+            if password_policy.verify_password(user.password, user_dict.password):
+                data = {"email": user_dict.email, "role": user_dict.role}
+                if password_policy.needs_rehash(user_dict.password):
+                    background_tasks.add_task(
+                        password_policy.rehash_password,
+                        collection_for(response_user),
+                        response_user["_id"],
+                        user.password,
+                        user_dict.password,
+                    )
 
         if data is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
@@ -100,6 +100,8 @@ def authentication(user: Auth):
         decode = jwt.decode(encoded_jwt, SECRET_KEY, algorithms=ALGORITHM)
 
         return {"access_token": encoded_jwt, "decoded": decode, "token_type": "bearer"}
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Something went wrong: {str(e)}")
     
@@ -141,21 +143,9 @@ def recover_password(email: str):
     - token que permite ser utilizado para realizar el cambio de contraseña.
     """
     try:
-        # Definir las colecciones a buscar
-        collections = [
-            {"collection": user_service_db.students, "model": Student},
-            {"collection": user_service_db.admins, "model": Admin},
-            {"collection": user_service_db.professors, "model": Professor},
-        ]
-        
-        user_data = None
-
         # Buscar el usuario por email en las colecciones
-        for entry in collections:
-            user_record = entry["collection"].find_one({"email": email})
-            if user_record:
-                user_data = entry["model"](**user_record)
-                break
+        with mongo_deadline():
+            user_data = find_user_by_email(email)
 
         if not user_data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
@@ -174,6 +164,8 @@ def recover_password(email: str):
             "recovery_token": recovery_token
         }
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al recuperar la contraseña: {str(e)}")
 
@@ -204,34 +196,48 @@ def change_password(token: str, new_password: str):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El token ha expirado")
 
         # Buscar el usuario por email en las colecciones
-        collections = [
-            {"collection": user_service_db.students, "model": Student},
-            {"collection": user_service_db.admins, "model": Admin},
-            {"collection": user_service_db.professors, "model": Professor},
-        ]
-        
-        user_data = None
-        collection = None
-
-        for entry in collections:
-            user_record = entry["collection"].find_one({"email": email})
-            if user_record:
-                user_data = entry["model"](**user_record)
-                collection = entry["collection"]
-                break
+        with mongo_deadline():
+            user_data = find_user_by_email(email)
 
         if not user_data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
 
         # Hashear la nueva contraseña
-        new_hashed_password = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        new_hashed_password = password_policy.hash_password(new_password)
 
         # Actualizar la contraseña en la base de datos
-        collection.update_one({"email": email}, {"$set": {"password": new_hashed_password}})
+        with mongo_deadline():
+            collection_for(user_data).update_one({"email": email}, {"$set": {"password": new_hashed_password}})
 
         return {"message": "Contraseña actualizada con éxito"}
 
     except JWTError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token inválido")
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al cambiar la contraseña: {str(e)}")
+
+@router.get("/password-policy")
+def password_policy_report(peak_rate: float = Query(default=password_policy.LOGIN_PEAK_RATE, gt=0)):
+    """
+    Endpoint para consultar el estado de los hashes de contraseñas.
+
+    Parámetros:
+    - **peak_rate:** Logins por segundo en hora punta usados para la proyección.
+
+    Retorna:
+    - **target_cost:** El costo de bcrypt configurado para los hashes nuevos.
+    - **pending_rehash:** La cantidad de usuarios cuyo hash usa otro costo.
+    - **cost_distribution:** La cantidad de usuarios por costo, en total y por colección.
+    - **projected_login_cpu_seconds_per_second:** Los segundos de CPU por segundo que consumiría
+      el login a **peak_rate**, con los costos actuales y una vez migrados todos al costo objetivo.
+    """
+    try:
+        collections = {name: get_database()[name] for name, _ in ROLE_COLLECTIONS.values()}
+        with mongo_deadline():
+            return password_policy.cost_report(collections, peak_rate)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
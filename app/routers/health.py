@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException, status
+
+from app.db import get_client
+from app.deadline import DeadlineExceeded, mongo_deadline
+from app.lifecycle import is_draining
+
+router = APIRouter()
+
+@router.get("/live")
+def liveness():
+    """
+    Endpoint de liveness: indica que el proceso está vivo y atendiendo requests.
+    No consulta dependencias externas.
+    """
+    return {"status": "alive"}
+
+@router.get("/ready")
+def readiness():
+    """
+    Endpoint de readiness: indica si el worker puede recibir tráfico.
+
+    Retorna 503 mientras el worker se está drenando tras un SIGTERM o si MongoDB no responde.
+    """
+    if is_draining():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="draining")
+    try:
+        with mongo_deadline():
+            get_client().admin.command("ping")
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"MongoDB unavailable: {e}")
+    return {"status": "ready"}
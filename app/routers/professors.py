@@ -1,16 +1,15 @@
+import json
+
 from fastapi import APIRouter, HTTPException
-from pymongo import MongoClient
 from bson import ObjectId
-from app.models import Professor
-from app.rabbitmq_consumer import run_consumer
+from app.db import get_database
+from app.deadline import DeadlineExceeded, mongo_deadline
+from app.bulk import bulk_change_status
+from app.models import BulkStatusChange, Professor
 from app.rabbitmq_event import send_message_to_rabbitmq
 
 router = APIRouter()
 
-# Conexión a la base de datos MongoDB
-mongodb_client = MongoClient("user_service_mongodb", 27017)
-user_service_db = mongodb_client.user_service
-
 @router.get("/")
 def list_all_professors():
     """
@@ -20,8 +19,11 @@ def list_all_professors():
     - Una lista de todos los profesores con estado 'active'.
     """
     try:
-        professors = user_service_db.professors.find({"status":"active"})
-        return [Professor(**professor) for professor in professors]
+        with mongo_deadline():
+            professors = get_database().professors.find({"status":"active"})
+            return [Professor(**professor) for professor in professors]
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -44,20 +46,23 @@ def register_new_professor(professor: Professor):
     - El ID del nuevo profesor registrado.
     """
     try:
-        res_email = user_service_db.professors.find_one({"email": professor.email})
+        with mongo_deadline():
+            res_email = get_database().professors.find_one({"email": professor.email})
         if res_email is None:
             professor.hash_password()  # Hashear la contraseña del profesor
             professor_dict = professor.dict()
-            result = user_service_db.professors.insert_one(professor_dict)
+            with mongo_deadline():
+                result = get_database().professors.insert_one(professor_dict)
 
             # Enviar mensaje a RabbitMQ
-            message = f"Professor {str(result.inserted_id)} created"
-            send_message_to_rabbitmq(f"professor.{str(result.inserted_id)}.created", message)
-            run_consumer(f"professor.{str(result.inserted_id)}.created")
+            message = json.dumps({"id": str(result.inserted_id), "message": f"Professor {str(result.inserted_id)} created"})
+            send_message_to_rabbitmq("professor.created", message)
 
             return {"inserted_id": str(result.inserted_id)}
         else:
             raise Exception("email already registered.")
+    except DeadlineExceeded:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
@@ -82,13 +87,16 @@ def get_professor_information(professor_id: str):
         - **department:** El departamento al que pertenece el profesor.
     """
     try:
-        professor_dict = user_service_db.professors.find_one(
-            {"_id": ObjectId(professor_id),"status":"active"},
-            {"password": 0}  # Excluir el campo de contraseña
-        )
+        with mongo_deadline():
+            professor_dict = get_database().professors.find_one(
+                {"_id": ObjectId(professor_id),"status":"active"},
+                {"password": 0}  # Excluir el campo de contraseña
+            )
         if professor_dict is None:
             raise HTTPException(status_code=404, detail="Professor not found")
         return Professor(**professor_dict)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -114,17 +122,19 @@ def update_professor_information(professor_id: str, professor: Professor):
     try:
         professor.hash_password()  # Hashear la nueva contraseña
         update_data = professor.dict(exclude={"id"})
-        result = user_service_db.professors.update_one({"_id": ObjectId(professor_id)}, {"$set": update_data})
+        with mongo_deadline():
+            result = get_database().professors.update_one({"_id": ObjectId(professor_id)}, {"$set": update_data})
 
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Professor not found or no changes made")
 
         # Enviar mensaje a RabbitMQ
-        message = f"Professor {str(professor_id)} updated"
-        send_message_to_rabbitmq(f"professor.{str(professor_id)}.updated", message)
-        run_consumer(f"professor.{str(professor_id)}.updated")
+        message = json.dumps({"id": str(professor_id), "message": f"Professor {str(professor_id)} updated"})
+        send_message_to_rabbitmq("professor.updated", message)
 
         return {"modified_count": result.modified_count}
+    except DeadlineExceeded:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
@@ -142,13 +152,43 @@ def delete_professor(professor_id: str):
     - Un mensaje confirmando que el profesor ha sido eliminado.
     """
     try:
-        result = user_service_db.professors.update_one({"_id": ObjectId(professor_id)}, {"$set": {"status": "inactive"}})
+        with mongo_deadline():
+            result = get_database().professors.update_one({"_id": ObjectId(professor_id)}, {"$set": {"status": "inactive"}})
 
         # Enviar mensaje a RabbitMQ
-        message = f"Professor {str(professor_id)} deleted"
-        send_message_to_rabbitmq(f"professor.{str(professor_id)}.deleted", message)
-        run_consumer(f"professor.{str(professor_id)}.deleted")
+        message = json.dumps({"id": str(professor_id), "message": f"Professor {str(professor_id)} deleted"})
+        send_message_to_rabbitmq("professor.deleted", message)
 
         return {"deleted": result.acknowledged}
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/bulk/status")
+def bulk_update_professors_status(change: BulkStatusChange):
+    """
+    Endpoint para cambiar el estado de muchos profesores en una sola operación
+    (por ejemplo, la eliminación lógica de un grupo completo).
+
+    Parámetros:
+    - **ids:** Lista de IDs de los profesores a modificar.
+    - **filter:** Campos a filtrar; se admite **department** (por ejemplo, `{"department": "Matemática"}`).
+    - **status:** El nuevo estado, 'inactive' por defecto.
+    - **dry_run:** Si es true, solo se informa cuántos profesores serían afectados.
+
+    Retorna:
+    - **matched_count:** La cantidad de profesores que cambian de estado.
+    - **modified_count:** La cantidad de registros modificados.
+    - **events_published:** La cantidad de eventos por lote enviados a RabbitMQ.
+    - **unpublished_ids:** Los IDs modificados (o que pudieron modificarse antes de agotarse el tiempo) cuyo evento no se publicó.
+    - **completed:** false si se agotó el tiempo antes de procesar todos los profesores; el resto se puede reintentar.
+    """
+    try:
+        return bulk_change_status("professors", "professor", change, allowed_filters={"department"})
+    except DeadlineExceeded:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,16 +1,15 @@
+import json
+
 from fastapi import APIRouter, HTTPException
-from pymongo import MongoClient
 from bson import ObjectId
-from app.models import Student
-from app.rabbitmq_consumer import run_consumer
+from app.db import get_database
+from app.deadline import DeadlineExceeded, mongo_deadline
+from app.bulk import bulk_change_status
+from app.models import BulkStatusChange, Student
 from app.rabbitmq_event import send_message_to_rabbitmq
 
 router = APIRouter()
 
-# Conexión a la base de datos MongoDB
-mongodb_client = MongoClient("user_service_mongodb", 27017)
-user_service_db = mongodb_client.user_service
-
 @router.get("/")
 def list_all_students():
     """
@@ -21,8 +20,11 @@ def list_all_students():
 
     """
     try:
-        students = user_service_db.students.find({"status":"active"})
-        return [Student(**student) for student in students]
+        with mongo_deadline():
+            students = get_database().students.find({"status":"active"})
+            return [Student(**student) for student in students]
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -46,20 +48,23 @@ def register_new_student(student: Student):
 
     """
     try:
-        res_email = user_service_db.students.find_one({"email": student.email})
+        with mongo_deadline():
+            res_email = get_database().students.find_one({"email": student.email})
         if res_email is None:
             student.hash_password()  # Hashear la contraseña del estudiante
             student_dict = student.dict()
-            result = user_service_db.students.insert_one(student_dict)
+            with mongo_deadline():
+                result = get_database().students.insert_one(student_dict)
 
             # Enviar mensaje a RabbitMQ
-            message = f"Student {str(result.inserted_id)} created"
-            send_message_to_rabbitmq(f"student.{str(result.inserted_id)}.created", message)
-            run_consumer(f"student.{str(result.inserted_id)}.created")
+            message = json.dumps({"id": str(result.inserted_id), "message": f"Student {str(result.inserted_id)} created"})
+            send_message_to_rabbitmq("student.created", message)
 
             return {"inserted_id": str(result.inserted_id)}
         else:
             raise Exception("email already registered.")
+    except DeadlineExceeded:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
@@ -85,13 +90,16 @@ def get_student_information(student_id: str):
 
     """
     try:
-        student_dict = user_service_db.students.find_one(
-            {"_id": ObjectId(student_id),"status":"active"},
-            {"password": 0}  # Excluir el campo de contraseña
-        )
+        with mongo_deadline():
+            student_dict = get_database().students.find_one(
+                {"_id": ObjectId(student_id),"status":"active"},
+                {"password": 0}  # Excluir el campo de contraseña
+            )
         if student_dict is None:
             raise HTTPException(status_code=404, detail="Student not found")
         return Student(**student_dict)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -118,17 +126,19 @@ def update_student_information(student_id: str, student: Student):
     try:
         student.hash_password()  # Hashear la nueva contraseña
         update_data = student.dict(exclude={"id"})
-        result = user_service_db.students.update_one({"_id": ObjectId(student_id)}, {"$set": update_data})
+        with mongo_deadline():
+            result = get_database().students.update_one({"_id": ObjectId(student_id)}, {"$set": update_data})
 
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Student not found or no changes made")
 
         # Enviar mensaje a RabbitMQ
-        message = f"Student {str(student_id)} updated"
-        send_message_to_rabbitmq(f"student.{str(student_id)}.updated", message)
-        run_consumer(f"student.{str(student_id)}.updated")
+        message = json.dumps({"id": str(student_id), "message": f"Student {str(student_id)} updated"})
+        send_message_to_rabbitmq("student.updated", message)
 
         return {"modified_count": result.modified_count}
+    except DeadlineExceeded:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
@@ -146,13 +156,43 @@ def delete_student(student_id: str):
     - Un mensaje confirmando que el estudiante ha sido eliminado.
     """
     try:
-        result = user_service_db.students.update_one({"_id": ObjectId(student_id)}, {"$set": {"status": "inactive"}})
+        with mongo_deadline():
+            result = get_database().students.update_one({"_id": ObjectId(student_id)}, {"$set": {"status": "inactive"}})
 
         # Enviar mensaje a RabbitMQ
-        message = f"Student {str(student_id)} deleted"
-        send_message_to_rabbitmq(f"student.{str(student_id)}.deleted", message)
-        run_consumer(f"student.{str(student_id)}.deleted")
+        message = json.dumps({"id": str(student_id), "message": f"Student {str(student_id)} deleted"})
+        send_message_to_rabbitmq("student.deleted", message)
 
         return {"deleted": result.acknowledged}
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/bulk/status")
+def bulk_update_students_status(change: BulkStatusChange):
+    """
+    Endpoint para cambiar el estado de muchos estudiantes en una sola operación
+    (por ejemplo, la eliminación lógica de un grupo completo).
+
+    Parámetros:
+    - **ids:** Lista de IDs de los estudiantes a modificar.
+    - **filter:** Campos a filtrar; se admite **major** (por ejemplo, `{"major": "Informática"}`).
+    - **status:** El nuevo estado, 'inactive' por defecto.
+    - **dry_run:** Si es true, solo se informa cuántos estudiantes serían afectados.
+
+    Retorna:
+    - **matched_count:** La cantidad de estudiantes que cambian de estado.
+    - **modified_count:** La cantidad de registros modificados.
+    - **events_published:** La cantidad de eventos por lote enviados a RabbitMQ.
+    - **unpublished_ids:** Los IDs modificados (o que pudieron modificarse antes de agotarse el tiempo) cuyo evento no se publicó.
+    - **completed:** false si se agotó el tiempo antes de procesar todos los estudiantes; el resto se puede reintentar.
+    """
+    try:
+        return bulk_change_status("students", "student", change, allowed_filters={"major"})
+    except DeadlineExceeded:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,63 @@
+from typing import Literal
+
+from bson.errors import InvalidId
+from fastapi import APIRouter, HTTPException, Query
+from app.deadline import DeadlineExceeded, mongo_deadline
+from app.directory import find_user_by_email, list_users, to_model
+
+router = APIRouter()
+
+@router.get("/")
+def list_all_users(
+    role: list[Literal["student", "professor", "administrator"]] | None = Query(default=None),
+    status: str | None = "active",
+    name: str | None = None,
+    after: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    """
+    Endpoint para listar usuarios de todos los roles en una sola consulta.
+
+    Parámetros:
+    - **role:** Uno o más roles a incluir ('student', 'professor', 'administrator'). Por defecto, todos.
+    - **status:** El estado de los usuarios a listar, 'active' por defecto.
+    - **name:** Prefijo del nombre de los usuarios.
+    - **after:** Cursor retornado por la página anterior.
+    - **limit:** Cantidad máxima de usuarios por página.
+
+    Retorna:
+    - **items:** Los usuarios de la página, ordenados por ID y sin contraseña, cada uno con su **role**.
+    - **next_cursor:** El valor de **after** para pedir la página siguiente, o null si no hay más.
+    """
+    try:
+        with mongo_deadline():
+            users, next_cursor = list_users(roles=role, status=status, name_prefix=name, after=after, limit=limit)
+        return {"items": [to_model(user) for user in users], "next_cursor": next_cursor}
+    except DeadlineExceeded:
+        raise
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/by-email")
+def get_user_by_email(email: str):
+    """
+    Endpoint para buscar un usuario por email en todos los roles.
+
+    Parámetros:
+    - **email:** El email del usuario.
+
+    Retorna:
+    - Los detalles del usuario sin incluir la contraseña, con su **role**.
+    """
+    try:
+        with mongo_deadline():
+            user = find_user_by_email(email)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return to_model(user)
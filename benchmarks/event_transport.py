@@ -0,0 +1,122 @@
+"""
+Benchmark de los transportes de eventos (app/event_bus.py).
+
+Publica N mensajes desde varios hilos productores a una cola mientras un
+consumidor la drena en lotes, y reporta la latencia de publicación y el throughput
+de punta a punta de cada transporte. Comparar "memory" con "amqp" aísla el
+costo del broker.
+
+Uso:
+    python benchmarks/event_transport.py --transport memory,amqp --messages 2000 --output bench_output.txt
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.event_bus import TRANSPORTS  # noqa: E402
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(transport_name: str, messages: int, producers: int, payload_size: int, batch_size: int, max_wait: float) -> dict:
+    transport = TRANSPORTS[transport_name]()
+    queue_name = f"benchmark.{uuid.uuid4().hex}"
+    payload = "x" * payload_size
+    received = 0
+    all_received = threading.Event()
+
+    def on_batch(events):
+        nonlocal received
+        received += len(events)
+        if received >= messages:
+            all_received.set()
+
+    def consume():
+        transport.consume_batches(queue_name, on_batch, batch_size, max_wait, stop=all_received)
+
+    latencies = [[] for _ in range(producers)]
+
+    def produce(index):
+        for _ in range(index, messages, producers):
+            start = time.perf_counter()
+            transport.publish(queue_name, payload)
+            latencies[index].append(time.perf_counter() - start)
+
+    # Una publicación previa verifica que el transporte esté disponible antes de cargarlo
+    warmup_queue = f"{queue_name}.warmup"
+    transport.publish(warmup_queue, payload)
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    try:
+        consumer.start()
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        publish_elapsed = time.perf_counter() - start
+        completed = all_received.wait(timeout=120)
+        total_elapsed = time.perf_counter() - start
+    finally:
+        # Las colas de AMQP son durables: se eliminan para no dejarlas en el broker
+        all_received.set()
+        consumer.join(timeout=5)
+        for name in (queue_name, f"{queue_name}.dead", warmup_queue):
+            transport.delete_queue(name)
+
+    samples = [latency for per_thread in latencies for latency in per_thread]
+    return {
+        "transport": transport_name,
+        "messages": messages,
+        "producers": producers,
+        "batch_size": batch_size,
+        "received": received,
+        "completed": completed,
+        "publish_rps": messages / publish_elapsed,
+        "end_to_end_rps": received / total_elapsed,
+        "publish_p50_ms": statistics.median(samples) * 1000,
+        "publish_p99_ms": percentile(samples, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", default="memory", help="transportes a medir, separados por coma")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--producers", type=int, default=8)
+    parser.add_argument("--payload-size", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=100, help="eventos por lote del consumidor")
+    parser.add_argument("--max-wait-ms", type=int, default=200, help="espera máxima para completar un lote")
+    parser.add_argument("--output", help="archivo al que se agrega el resultado como una línea JSON")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.transport.split(","):
+        try:
+            results.append(run(name, args.messages, args.producers, args.payload_size, args.batch_size, args.max_wait_ms / 1000))
+        except Exception as e:
+            results.append({"transport": name, "error": str(e)})
+
+    result = {"timestamp": datetime.now(timezone.utc).isoformat(), "cpu_count": os.cpu_count(), "results": results}
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "a") as output:
+            output.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
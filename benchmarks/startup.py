@@ -0,0 +1,167 @@
+"""
+Benchmark de arranque y throughput por core del perfil de producción.
+
+Mide:
+- el tiempo de importación en frío de app.main (en procesos nuevos),
+- el tiempo hasta que gunicorn responde /health/live para cada cantidad de workers,
+- el throughput de /health/live y su valor por worker,
+- el tiempo de drenado tras SIGTERM.
+
+/health/live no toca MongoDB ni RabbitMQ, así que el benchmark corre sin dependencias externas.
+
+Uso:
+    python benchmarks/startup.py --workers 1,4 --duration 10 --output bench_output.txt
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_cold_import(runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, text=True)
+        samples.append(float(output.strip().splitlines()[-1]))
+    return {"runs": runs, "median_s": statistics.median(samples), "max_s": max(samples)}
+
+
+def wait_until_live(port: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health/live")
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.02)
+    return False
+
+
+def hammer(port: int, duration: float, concurrency: int) -> dict:
+    counts = [0] * concurrency
+    errors = [0] * concurrency
+    stop_at = time.monotonic() + duration
+
+    def worker(index):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        while time.monotonic() < stop_at:
+            try:
+                conn.request("GET", "/health/live")
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    counts[index] += 1
+                else:
+                    errors[index] += 1
+            except (OSError, http.client.HTTPException):
+                errors[index] += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {"requests": sum(counts), "errors": sum(errors), "rps": sum(counts) / duration}
+
+
+def measure_server(workers: int, duration: float, concurrency: int) -> dict:
+    port = free_port()
+    # Sin espera de drenado, para medir solo el cierre de los requests en curso
+    env = dict(
+        os.environ,
+        BIND=f"127.0.0.1:{port}",
+        WEB_CONCURRENCY=str(workers),
+        LOG_LEVEL="warning",
+        DRAIN_DELAY_SECONDS="0",
+    )
+    start = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null", "app.main:app"],
+        cwd=ROOT,
+        env=env,
+    )
+    try:
+        if not wait_until_live(port, timeout=60):
+            raise RuntimeError(f"gunicorn with {workers} workers did not become live")
+        time_to_live = time.monotonic() - start
+
+        load = hammer(port, duration, concurrency)
+
+        drain_start = time.monotonic()
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=120)
+        drain = time.monotonic() - drain_start
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+    return {
+        "workers": workers,
+        "time_to_live_s": time_to_live,
+        "rps": load["rps"],
+        "rps_per_worker": load["rps"] / workers,
+        "requests": load["requests"],
+        "errors": load["errors"],
+        "drain_s": drain,
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=f"1,{os.cpu_count()}", help="lista de cantidades de workers a medir")
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos de carga por configuración")
+    parser.add_argument("--concurrency", type=int, default=32, help="conexiones concurrentes del generador de carga")
+    parser.add_argument("--import-runs", type=int, default=5, help="repeticiones de la importación en frío")
+    parser.add_argument("--output", help="archivo al que se agrega el resultado como una línea JSON")
+    args = parser.parse_args()
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "cpu_count": os.cpu_count(),
+        "cold_import": measure_cold_import(args.import_runs),
+        "servers": [
+            measure_server(int(workers), args.duration, args.concurrency)
+            for workers in sorted({int(w) for w in args.workers.split(",")})
+        ],
+    }
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "a") as output:
+            output.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
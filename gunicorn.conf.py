@@ -0,0 +1,23 @@
+# Perfil de producción: gunicorn como gestor de procesos con workers de uvicorn.
+# Uso: gunicorn -c gunicorn.conf.py app.main:app
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:80")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# La app se importa una sola vez en el maestro y se comparte con los workers
+# vía fork. Es seguro porque MongoDB y RabbitMQ se conectan de forma perezosa
+# dentro de cada worker (ver app/db.py).
+preload_app = os.environ.get("PRELOAD_APP", "true").lower() == "true"
+
+# Tiempo que un worker tiene para terminar sus requests en curso tras SIGTERM;
+# debe superar DRAIN_DELAY_SECONDS (ver app/lifecycle.py)
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+keepalive = int(os.environ.get("KEEPALIVE", "5"))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info")
@@ -0,0 +1,127 @@
+import time
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import ExecutionTimeout
+from pymongo.results import UpdateResult
+
+from app import bulk, deadline
+from app.bulk import build_query, bulk_change_status
+from app.deadline import Deadline
+from app.models import BulkStatusChange
+
+
+def test_query_by_ids_skips_documents_already_in_status():
+    ids = [str(ObjectId()), str(ObjectId())]
+
+    query = build_query(BulkStatusChange(ids=ids, status="active"), set())
+
+    assert query == {"status": {"$ne": "active"}, "_id": {"$in": [ObjectId(id) for id in ids]}}
+
+
+def test_query_by_allowed_filter():
+    query = build_query(BulkStatusChange(filter={"major": "Informática"}), {"major"})
+
+    assert query == {"status": {"$ne": "inactive"}, "major": "Informática"}
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        BulkStatusChange(),
+        BulkStatusChange(ids=[], filter={}),
+        BulkStatusChange(ids=[str(ObjectId())], filter={"major": "Informática"}),
+    ],
+)
+def test_requires_exactly_one_of_ids_or_filter(change):
+    with pytest.raises(ValueError):
+        build_query(change, {"major"})
+
+
+def test_rejects_invalid_object_ids():
+    with pytest.raises(ValueError):
+        build_query(BulkStatusChange(ids=["no-es-un-id"]), set())
+
+
+def test_rejects_unsupported_filter_fields():
+    with pytest.raises(ValueError, match="password"):
+        build_query(BulkStatusChange(filter={"major": "Informática", "password": "x"}), {"major"})
+
+
+class FakeCollection:
+    def __init__(self, ids, fail_updates_from=None):
+        self.ids = ids
+        self.fail_updates_from = fail_updates_from
+        self.updates = []
+
+    def find(self, query, projection):
+        return [{"_id": id} for id in self.ids]
+
+    def update_many(self, query, update):
+        self.updates.append(query["_id"]["$in"])
+        if self.fail_updates_from is not None and len(self.updates) >= self.fail_updates_from:
+            raise ExecutionTimeout("operation exceeded time limit", code=50)
+        return UpdateResult({"nModified": len(query["_id"]["$in"])}, acknowledged=True)
+
+
+@pytest.fixture
+def bulk_run(monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 2)
+    published = []
+
+    def run(collection, fail_publish_on=()):
+        monkeypatch.setattr(bulk, "get_database", lambda: {"students": collection})
+
+        def publish(routing_key, message):
+            if len(published) + 1 in fail_publish_on:
+                published.append(None)
+                raise ConnectionError("broker caído")
+            published.append(message)
+
+        monkeypatch.setattr(bulk, "send_message_to_rabbitmq", publish)
+        return bulk_change_status("students", "student", BulkStatusChange(filter={"major": "Informática"}), {"major"})
+
+    return run
+
+
+def test_timeout_mid_run_returns_partial_progress(bulk_run):
+    ids = [ObjectId() for _ in range(6)]
+    collection = FakeCollection(ids, fail_updates_from=2)
+
+    result = bulk_run(collection, fail_publish_on={1})
+
+    assert result["completed"] is False
+    assert result["matched_count"] == 6
+    assert result["processed_count"] == 2
+    assert result["modified_count"] == 2
+    assert result["events_published"] == 0
+    # El bloque 1 se aplicó sin evento y el 2 quedó interrumpido
+    assert result["unpublished_ids"] == [str(id) for id in ids[:4]]
+    assert len(collection.updates) == 2
+
+
+def test_stops_before_deadline_to_return_partial_result(bulk_run, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_RESPONSE_RESERVE_MS", 1000)
+    now = time.monotonic()
+    token = deadline._current_deadline.set(Deadline(route="/bulk", start=now, expires_at=now + 0.5))
+    try:
+        collection = FakeCollection([ObjectId() for _ in range(4)])
+        result = bulk_run(collection)
+    finally:
+        deadline._current_deadline.reset(token)
+
+    assert result["completed"] is False
+    assert result["processed_count"] == 0
+    assert collection.updates == []
+
+
+def test_completes_all_chunks(bulk_run):
+    ids = [ObjectId() for _ in range(5)]
+    collection = FakeCollection(ids)
+
+    result = bulk_run(collection)
+
+    assert result["completed"] is True
+    assert result["processed_count"] == 5
+    assert result["events_published"] == 3
+    assert result["unpublished_ids"] == []
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pymongo.errors import ExecutionTimeout, OperationFailure
+
+from app import deadline
+from app.deadline import Deadline, DeadlineExceeded, DeadlineMiddleware, budget_for, mongo_deadline
+
+
+@pytest.fixture(autouse=True)
+def empty_histogram(monkeypatch):
+    monkeypatch.setattr(deadline, "_expirations", {})
+
+
+@pytest.fixture
+def request_deadline():
+    tokens = []
+
+    def start(seconds: float, route: str = "/api/v1/students/"):
+        now = time.monotonic()
+        tokens.append(deadline._current_deadline.set(Deadline(route=route, start=now, expires_at=now + seconds)))
+
+    yield start
+    for token in reversed(tokens):
+        deadline._current_deadline.reset(token)
+
+
+def histogram_totals() -> dict:
+    return {(series["route"], series["stage"]): series["total"] for series in deadline.expiry_histogram()["series"]}
+
+
+def test_budget_for_uses_longest_matching_prefix(monkeypatch):
+    monkeypatch.setattr(deadline, "DEFAULT_BUDGET_MS", 5000)
+    monkeypatch.setattr(deadline, "ROUTE_BUDGETS_MS", {"/api/v1/students": 2000, "/api/v1/students/bulk": 30000})
+
+    assert budget_for("/api/v1/students/bulk/status") == 30000
+    assert budget_for("/api/v1/students/123") == 2000
+    assert budget_for("/api/v1/professors/") == 5000
+
+
+@pytest.mark.parametrize(
+    "path, route",
+    [
+        ("/api/v1/students/65f1c0ffee0123456789abcd", "/api/v1/students/{id}"),
+        ("/api/v1/students/65f1c0ffee0123456789abcd/status", "/api/v1/students/{id}/status"),
+        ("/api/v1/students/bulk/status", "/api/v1/students/bulk/status"),
+        ("/api/v1/students/65f1c0ffee0123456789abcdef", "/api/v1/students/65f1c0ffee0123456789abcdef"),
+    ],
+)
+def test_object_ids_are_grouped_in_routes(path, route):
+    assert deadline.OBJECT_ID_SEGMENT.sub("/{id}", path) == route
+
+
+def test_mongo_deadline_maps_pymongo_timeouts(request_deadline):
+    request_deadline(1)
+
+    with pytest.raises(DeadlineExceeded) as error:
+        with mongo_deadline():
+            raise ExecutionTimeout("operation exceeded time limit", code=50)
+
+    assert error.value.status_code == 503
+    assert histogram_totals() == {("/api/v1/students/", "mongo"): 1}
+
+
+def test_mongo_deadline_keeps_other_errors(request_deadline):
+    request_deadline(1)
+
+    with pytest.raises(OperationFailure):
+        with mongo_deadline():
+            raise OperationFailure("duplicate key", code=11000)
+
+    assert histogram_totals() == {}
+
+
+def test_mongo_deadline_rejects_expired_budget_without_calling_pymongo(request_deadline):
+    request_deadline(-0.001)
+
+    with pytest.raises(DeadlineExceeded):
+        with mongo_deadline():
+            pytest.fail("el bloque no debe ejecutarse sin tiempo restante")
+
+
+def test_mongo_deadline_without_request_has_no_timeout():
+    with mongo_deadline():
+        assert deadline.remaining() is None
+
+
+def test_expired_request_is_counted_once(monkeypatch):
+    monkeypatch.setattr(deadline, "DEFAULT_BUDGET_MS", 50)
+    monkeypatch.setattr(deadline, "HARD_TIMEOUT_GRACE_MS", 0)
+    finished = threading.Event()
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware)
+
+    @app.get("/slow")
+    def slow():
+        # Simula a pymongo reportando su timeout después de que el middleware cortó el request
+        try:
+            time.sleep(0.2)
+            with mongo_deadline():
+                pass
+        finally:
+            finished.set()
+
+    response = TestClient(app).get("/slow")
+    assert finished.wait(2)
+
+    assert response.status_code == 503
+    assert histogram_totals() == {("/slow", "request"): 1}
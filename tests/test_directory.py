@@ -0,0 +1,128 @@
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import directory
+from app.directory import find_user_by_email, list_users
+from app.routers import users
+
+
+class FakeDatabase:
+    """Registra los pipelines de aggregate y retorna documentos fijos."""
+
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.calls = []
+
+    def __getitem__(self, collection_name):
+        database = self
+
+        class Collection:
+            def aggregate(self, pipeline):
+                database.calls.append((collection_name, pipeline))
+                return iter(database.results)
+
+        return Collection()
+
+
+@pytest.fixture
+def database(monkeypatch):
+    fake = FakeDatabase()
+    monkeypatch.setattr(directory, "get_database", lambda: fake)
+    return fake
+
+
+def branches(collection_name, pipeline):
+    """Separa el pipeline en (colección, etapas) por rama de $unionWith, más las etapas finales."""
+    result = [(collection_name, [])]
+    tail = []
+    for stage in pipeline:
+        if "$unionWith" in stage:
+            result.append((stage["$unionWith"]["coll"], stage["$unionWith"]["pipeline"]))
+        elif len(result) == 1:
+            result[0][1].append(stage)
+        else:
+            tail.append(stage)
+    return result, tail
+
+
+def test_list_users_uses_keyset_cursor_in_every_collection(database):
+    after = ObjectId()
+
+    list_users(after=str(after), limit=10)
+
+    [(collection_name, pipeline)] = database.calls
+    parts, tail = branches(collection_name, pipeline)
+    assert [name for name, _ in parts] == ["students", "admins", "professors"]
+    for _, stages in parts:
+        assert stages[0] == {"$match": {"status": "active", "_id": {"$gt": after}}}
+        assert {"$sort": {"_id": 1}} in stages
+        assert {"$limit": 11} in stages
+        assert {"$project": {"password": 0}} in stages
+    assert tail == [{"$sort": {"_id": 1}}, {"$limit": 11}]
+
+
+def test_list_users_tags_each_branch_with_its_role(database):
+    list_users(roles=["professor", "student"])
+
+    [(collection_name, pipeline)] = database.calls
+    parts, _ = branches(collection_name, pipeline)
+    roles = {name: stages[-1]["$addFields"]["role"] for name, stages in parts}
+    assert roles == {"students": "student", "professors": "professor"}
+
+
+def test_list_users_returns_cursor_when_there_are_more_pages(database):
+    ids = sorted(ObjectId() for _ in range(4))
+    database.results = [{"_id": id} for id in ids]
+
+    page, next_cursor = list_users(limit=3)
+
+    assert [user["_id"] for user in page] == ids[:3]
+    assert next_cursor == str(ids[2])
+
+
+def test_list_users_has_no_cursor_on_last_page(database):
+    ids = sorted(ObjectId() for _ in range(3))
+    database.results = [{"_id": id} for id in ids]
+
+    page, next_cursor = list_users(limit=3)
+
+    assert len(page) == 3
+    assert next_cursor is None
+
+
+def test_find_user_by_email_prefers_student_then_admin_then_professor(database):
+    find_user_by_email("ana@usm.cl")
+
+    [(collection_name, pipeline)] = database.calls
+    parts, tail = branches(collection_name, pipeline)
+    ranks = {}
+    for name, stages in parts:
+        assert stages[0] == {"$match": {"email": "ana@usm.cl"}}
+        fields = stages[-1]["$addFields"]
+        ranks[fields["role"]] = fields["_rank"]
+    assert sorted(ranks, key=ranks.get) == ["student", "administrator", "professor"]
+    assert tail[:2] == [{"$sort": {"_rank": 1}}, {"$limit": 1}]
+
+
+def test_find_user_by_email_hides_password_unless_requested(database):
+    find_user_by_email("ana@usm.cl")
+    find_user_by_email("ana@usm.cl", include_password=True)
+
+    projections = [pipeline[-1]["$project"] for _, pipeline in database.calls]
+    assert projections == [{"_rank": 0, "password": 0}, {"_rank": 0}]
+
+
+def test_find_user_by_email_returns_none_when_missing(database):
+    assert find_user_by_email("nadie@usm.cl") is None
+
+
+def test_invalid_cursor_returns_400(database):
+    app = FastAPI()
+    app.include_router(users.router, prefix="/api/v1/users")
+
+    response = TestClient(app).get("/api/v1/users/", params={"after": "no-es-un-cursor"})
+
+    assert response.status_code == 400
+    assert database.calls == []
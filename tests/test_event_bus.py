@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from app import event_bus
+from app.event_bus import InProcessTransport
+
+
+def consume_in_background(transport, queue_name, batch_size, max_wait, on_batch=None):
+    batches = []
+    stop = threading.Event()
+
+    def handle(batch):
+        if on_batch is not None:
+            on_batch(batch)
+        batches.append((time.monotonic(), batch))
+
+    thread = threading.Thread(
+        target=transport.consume_batches, args=(queue_name, handle, batch_size, max_wait, stop), daemon=True
+    )
+    thread.start()
+    return batches, stop, thread
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "la condición no se cumplió a tiempo"
+        time.sleep(0.01)
+
+
+def test_flushes_when_batch_is_full():
+    transport = InProcessTransport()
+    for i in range(3):
+        transport.publish("student.created", str(i))
+
+    start = time.monotonic()
+    batches, stop, thread = consume_in_background(transport, "student.created", batch_size=3, max_wait=10)
+    wait_for(lambda: len(batches) == 1)
+    stop.set()
+    thread.join()
+
+    flushed_at, batch = batches[0]
+    assert [event.body for event in batch] == [b"0", b"1", b"2"]
+    assert flushed_at - start < 1
+
+
+def test_flushes_partial_batch_after_max_wait():
+    transport = InProcessTransport()
+    transport.publish("student.created", "0")
+    transport.publish("student.created", "1")
+
+    batches, stop, thread = consume_in_background(transport, "student.created", batch_size=100, max_wait=0.05)
+    wait_for(lambda: len(batches) == 1)
+    stop.set()
+    thread.join()
+
+    assert [event.body for event in batches[0][1]] == [b"0", b"1"]
+    assert transport.pending("student.created") == 0
+
+
+def test_dead_letters_batch_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(event_bus, "CONSUMER_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(event_bus, "CONSUMER_RETRY_DELAY_MS", 0)
+    transport = InProcessTransport()
+    transport.publish("student.created", "0")
+    attempts = []
+
+    def reject(batch):
+        attempts.append(batch)
+        raise RuntimeError("handler roto")
+
+    _, stop, thread = consume_in_background(transport, "student.created", 10, 0.01, on_batch=reject)
+    wait_for(lambda: transport.pending("student.created.dead") == 1)
+    stop.set()
+    thread.join()
+
+    assert len(attempts) == 3
+
+
+def test_discards_idle_queues_to_stay_under_the_limit():
+    transport = InProcessTransport(max_queues=2)
+    _, stop, thread = consume_in_background(transport, "student.created", 10, 0.01)
+    wait_for(lambda: transport.pending("student.created") == 0 and "student.created" in transport._queues)
+    transport.publish("professor.created", "0")
+
+    # La cola de profesores tiene un evento pendiente y la de estudiantes un consumidor
+    with pytest.raises(RuntimeError):
+        transport.publish("administrative.created", "0")
+
+    stop.set()
+    thread.join()
+    transport.publish("administrative.created", "0")
+    assert transport.pending("administrative.created") == 1
+
+
+def test_delete_queue_drops_pending_events():
+    transport = InProcessTransport()
+    transport.publish("student.created", "0")
+
+    transport.delete_queue("student.created")
+    transport.delete_queue("professor.created")
+
+    assert transport.pending("student.created") == 0
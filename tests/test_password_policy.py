@@ -0,0 +1,39 @@
+import bcrypt
+import pytest
+
+from app import password_policy
+from app.password_policy import hash_cost, needs_rehash
+
+
+def bcrypt_hash(cost: int) -> str:
+    return bcrypt.hashpw(b"secreto", bcrypt.gensalt(rounds=cost)).decode("utf-8")
+
+
+@pytest.mark.parametrize("cost", [4, 5])
+def test_hash_cost_reads_cost_from_bcrypt_hash(cost):
+    assert hash_cost(bcrypt_hash(cost)) == cost
+
+
+@pytest.mark.parametrize("hashed", ["", "texto-plano", "$2b$xx$abc"])
+def test_hash_cost_is_none_for_invalid_hashes(hashed):
+    assert hash_cost(hashed) is None
+
+
+def test_needs_rehash_when_cost_differs_from_policy(monkeypatch):
+    monkeypatch.setattr(password_policy, "BCRYPT_COST", 5)
+
+    assert needs_rehash(bcrypt_hash(4))
+    assert not needs_rehash(bcrypt_hash(5))
+
+
+def test_needs_rehash_for_invalid_hashes():
+    assert needs_rehash("texto-plano")
+
+
+def test_hash_password_uses_policy_cost(monkeypatch):
+    monkeypatch.setattr(password_policy, "BCRYPT_COST", 4)
+
+    hashed = password_policy.hash_password("secreto")
+
+    assert hash_cost(hashed) == 4
+    assert password_policy.verify_password("secreto", hashed)
@@ -0,0 +1,87 @@
+import logging
+
+import pytest
+
+from app.event_bus import new_event
+from app.rabbitmq_consumer import EventPipeline, SeenSet, log_events
+
+
+def test_seen_set_evicts_oldest_ids():
+    seen = SeenSet(max_size=2)
+    seen.add("a")
+    seen.add("b")
+    seen.add("c")
+
+    assert "a" not in seen
+    assert "b" in seen
+    assert "c" in seen
+
+
+def test_seen_set_refreshes_readded_ids():
+    seen = SeenSet(max_size=2)
+    seen.add("a")
+    seen.add("b")
+    seen.add("a")
+    seen.add("c")
+
+    assert "a" in seen
+    assert "b" not in seen
+
+
+def test_redelivered_batch_skips_handlers_that_already_succeeded():
+    pipeline = EventPipeline(seen_set_size=100)
+    logged = []
+    counted = []
+    fail = [True]
+
+    def count(events):
+        if fail[0]:
+            raise RuntimeError("fallo transitorio")
+        counted.extend(events)
+
+    pipeline.register("log", logged.extend)
+    pipeline.register("count", count)
+    batch = [new_event("student.created", '{"id": "1"}'), new_event("student.created", '{"id": "2"}')]
+
+    with pytest.raises(RuntimeError):
+        pipeline.handle_batch(batch)
+    fail[0] = False
+    pipeline.handle_batch(batch)
+
+    assert logged == batch
+    assert counted == batch
+    handlers = pipeline.metrics()["handlers"]
+    assert handlers["log"]["duplicates"] == 2
+    assert handlers["count"]["failures"] == 1
+    assert handlers["count"]["events"] == 2
+
+
+def test_duplicates_within_a_batch_are_handled_once():
+    pipeline = EventPipeline(seen_set_size=100)
+    received = []
+    pipeline.register("log", received.extend)
+    event = new_event("student.created", '{"id": "1"}')
+
+    pipeline.handle_batch([event, event])
+
+    assert received == [event]
+    assert pipeline.metrics()["handlers"]["log"]["duplicates"] == 1
+
+
+def test_handlers_only_receive_their_routing_prefix():
+    pipeline = EventPipeline(seen_set_size=100)
+    received = []
+    pipeline.register("students", received.extend, routing_prefix="student.")
+    student = new_event("student.created", '{"id": "1"}')
+
+    pipeline.handle_batch([student, new_event("professor.created", '{"id": "2"}')])
+
+    assert received == [student]
+
+
+def test_log_events_writes_to_debug_log(caplog):
+    with caplog.at_level(logging.DEBUG, logger="app.rabbitmq_consumer"):
+        log_events([new_event("student.created", '{"id": "1"}')])
+
+    assert [record.levelno for record in caplog.records] == [logging.DEBUG]
+    assert "{'id': '1'}" in caplog.text